@@ -1,12 +1,67 @@
 """Alerting system with Telegram notifications and anti-spam logic."""
 import os
 import sys
+import threading
 import time
 import requests
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Set, Tuple
+from urllib3.util.retry import Retry
 from config import AlertProfile, Config
 from db import AlertState, Database
 
+# States that count as a problem for alerting
+_BAD_STATES = frozenset(('SLOW', 'DOWN'))
+
+# Emoji and title for each alert type
+_ALERT_STYLE = {
+    'DOWN': ('🔴', 'DOWN'),
+    'SLOW': ('🟠', 'SLOW'),
+    'RECOVERED': ('🟢', 'RECOVERED'),
+}
+
+# Upper bound on simultaneous sendMessage requests during a flush
+MAX_PARALLEL_SENDS = 8
+
+# Telegram rejects messages longer than 4096 characters
+MAX_MESSAGE_LENGTH = 4000
+
+
+def split_message(blocks: List[str], limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Join text blocks with newlines into as few messages as fit under limit."""
+    return [chunk for chunk, _ in _chunk_blocks(blocks, limit)]
+
+
+def _chunk_blocks(blocks: List[str], limit: int = MAX_MESSAGE_LENGTH) -> List[Tuple[str, List[int]]]:
+    """Split blocks like split_message, pairing each chunk with the indices of the blocks it completes."""
+    chunks: List[Tuple[str, List[int]]] = []
+    current = ''
+    completed: List[int] = []
+    
+    for index, block in enumerate(blocks):
+        candidate = f"{current}\n{block}" if current else block
+        if len(candidate) <= limit:
+            current = candidate
+            completed.append(index)
+            continue
+        
+        if current:
+            chunks.append((current, completed))
+        
+        # A single oversized block is cut at the limit; it is complete only
+        # once its last piece is sent
+        while len(block) > limit:
+            chunks.append((block[:limit], []))
+            block = block[limit:]
+        current = block
+        completed = [index]
+    
+    if current:
+        chunks.append((current, completed))
+    
+    return chunks
+
 
 class AlertManager:
     """Manages alerts with anti-spam and hysteresis logic."""
@@ -17,10 +72,59 @@ class AlertManager:
         self.config = config
         self.bot_token = os.getenv('BOT_TOKEN')
         self.chat_id = os.getenv('CHAT_ID')
+        self._api_url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+        
+        # Each thread keeps its own keep-alive Session (Session is not
+        # thread-safe); see _session()
+        self._tls = threading.local()
+        
+        # Long-lived sender threads, so their Sessions survive between flushes
+        self._send_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_SENDS)
+        
+        # Alerts queued by process_check_result, sent by flush_alerts
+        self._pending: List[Tuple[str, str, str, Optional[dict]]] = []
+        
+        # Alert states loaded or computed during this run (None: no state
+        # yet); the dirty ones are written in one batch by flush_alerts,
+        # which then clears the cache
+        self._state_cache: Dict[str, Optional[AlertState]] = {}
+        self._dirty_states: Set[str] = set()
         
         if not self.bot_token or not self.chat_id:
             print("WARNING: BOT_TOKEN or CHAT_ID not set. Alerts will not be sent.")
     
+    def _build_session(self) -> requests.Session:
+        """Build a Session with a keep-alive pool sized to the worker count."""
+        workers = self.config.defaults.max_workers if self.config else MAX_PARALLEL_SENDS
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(
+            pool_connections=workers,
+            pool_maxsize=workers * 2,
+            # Never retry a read error: Telegram may already have delivered
+            # the message, and a re-post would duplicate the alert
+            max_retries=Retry(
+                total=2,
+                read=False,
+                backoff_factor=0.2,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=frozenset(['POST']),
+            ),
+        ))
+        return session
+    
+    def _session(self) -> requests.Session:
+        """Return the calling thread's Session, creating it on first use."""
+        session = getattr(self._tls, 'session', None)
+        if session is None:
+            session = self._tls.session = self._build_session()
+        return session
+    
+    def load_states(self, target_ids: List[str]):
+        """Prefetch alert states for targets about to be checked in one query."""
+        states = self.db.get_alert_states_bulk(target_ids)
+        for target_id in target_ids:
+            self._state_cache.setdefault(target_id, states.get(target_id))
+    
     def process_check_result(
         self,
         target_id: str,
@@ -29,18 +133,22 @@ class AlertManager:
         metrics: Optional[dict] = None,
     ) -> bool:
         """
-        Process check result and send alert if needed.
+        Process check result and queue alert if needed.
         
         Returns:
-            True if alert was sent, False otherwise.
+            True if alert was queued, False otherwise.
         """
         now = time.time()
-        current_state = self.db.get_alert_state(target_id)
+        if target_id in self._state_cache:
+            current_state = self._state_cache[target_id]
+        else:
+            current_state = self.db.get_alert_state(target_id)
+        is_bad = new_state in _BAD_STATES
         
         if not current_state:
             # First check - initialize state
-            is_bad = new_state in ('SLOW', 'DOWN')
-            self.db.update_alert_state(
+            self._store_state(
+                previous=None,
                 target_id=target_id,
                 new_state=new_state,
                 bad_since_ts=now if is_bad else None,
@@ -50,7 +158,6 @@ class AlertManager:
             return False
         
         # Update consecutive counters
-        is_bad = new_state in ('SLOW', 'DOWN')
         is_good = new_state == 'OK'
         
         if is_bad:
@@ -63,70 +170,50 @@ class AlertManager:
             new_failures = current_state.consecutive_failures
             new_successes = current_state.consecutive_successes
         
-        # Determine if we should send alert
-        should_alert = False
-        alert_type = None
+        # Determine which alert, if any, this transition raises
+        alert_type: Optional[str] = None
         
         old_state = current_state.last_state
+        was_bad = old_state in _BAD_STATES
         
         # State transition: OK -> SLOW/DOWN
-        if old_state == 'OK' and new_state in ('SLOW', 'DOWN'):
+        if old_state == 'OK' and is_bad:
             if new_failures >= alert_profile.fail_count_to_alert:
-                should_alert = True
-                alert_type = 'DOWN' if new_state == 'DOWN' else 'SLOW'
+                alert_type = new_state
         
         # State transition: SLOW/DOWN -> OK
-        elif old_state in ('SLOW', 'DOWN') and new_state == 'OK':
+        elif was_bad and is_good:
             if new_successes >= alert_profile.recover_count:
-                should_alert = True
                 alert_type = 'RECOVERED'
         
         # State transition: SLOW -> DOWN
         elif old_state == 'SLOW' and new_state == 'DOWN':
             if new_failures >= alert_profile.fail_count_to_alert:
-                should_alert = True
                 alert_type = 'DOWN'
         
         # State transition: DOWN -> SLOW
         elif old_state == 'DOWN' and new_state == 'SLOW':
             # SLOW is still a problem, but notify about change
-            should_alert = True
             alert_type = 'SLOW'
         
         # First alert for persistent problem (page was DOWN from the start)
-        elif new_state in ('SLOW', 'DOWN') and old_state in ('SLOW', 'DOWN'):
+        elif is_bad and was_bad:
             # Only send if never sent before and have enough failures
             if new_failures >= alert_profile.fail_count_to_alert and not current_state.last_sent_ts:
-                should_alert = True
-                alert_type = 'DOWN' if new_state == 'DOWN' else 'SLOW'
-        
-        # Send alert if needed
-        if should_alert:
-            success = self._send_alert(target_id, alert_type, new_state, metrics)
-            
-            bad_since = current_state.bad_since_ts
-            if new_state in ('SLOW', 'DOWN') and not bad_since:
-                bad_since = now
-            
-            self.db.update_alert_state(
-                target_id=target_id,
-                new_state=new_state,
-                bad_since_ts=bad_since if new_state in ('SLOW', 'DOWN') else None,
-                last_sent_ts=now if success else current_state.last_sent_ts,
-                consecutive_failures=new_failures,
-                consecutive_successes=new_successes,
-            )
-            
-            return success
+                alert_type = new_state
+        
+        # Queue alert; it is sent by flush_alerts() at the end of the run
+        if alert_type:
+            self._pending.append((target_id, alert_type, new_state, metrics))
         
-        # Update state without sending alert
         bad_since = current_state.bad_since_ts
-        if new_state in ('SLOW', 'DOWN') and not bad_since:
-            bad_since = now
-        elif new_state == 'OK':
+        if not is_bad:
             bad_since = None
+        elif not bad_since:
+            bad_since = now
         
-        self.db.update_alert_state(
+        self._store_state(
+            previous=current_state,
             target_id=target_id,
             new_state=new_state,
             bad_since_ts=bad_since,
@@ -135,61 +222,140 @@ class AlertManager:
             consecutive_successes=new_successes,
         )
         
-        return False
+        return alert_type is not None
+    
+    def _store_state(
+        self,
+        previous: Optional[AlertState],
+        target_id: str,
+        new_state: str,
+        bad_since_ts: Optional[float] = None,
+        last_sent_ts: Optional[float] = None,
+        consecutive_failures: int = 0,
+        consecutive_successes: int = 0,
+    ):
+        """Record new alert state; it is written to the database on flush."""
+        # Mirror update_alert_state: None keeps the previously stored value
+        self._state_cache[target_id] = AlertState(
+            target_id=target_id,
+            last_state=new_state,
+            bad_since_ts=bad_since_ts if bad_since_ts is not None else (
+                previous.bad_since_ts if previous else None
+            ),
+            last_sent_ts=last_sent_ts if last_sent_ts is not None else (
+                previous.last_sent_ts if previous else None
+            ),
+            consecutive_failures=consecutive_failures,
+            consecutive_successes=consecutive_successes,
+        )
+        self._dirty_states.add(target_id)
+    
+    def reset(self):
+        """Drop queued alerts and cached states, e.g. after the run's writes were rolled back."""
+        self._pending = []
+        self._state_cache.clear()
+        self._dirty_states = set()
+    
+    def flush_states(self):
+        """Write all alert states changed since the last flush in one batch."""
+        dirty, self._dirty_states = self._dirty_states, set()
+        self.db.update_alert_states_many([
+            self._state_cache[target_id] for target_id in dirty
+        ])
+    
+    def flush_alerts(self) -> int:
+        """
+        Write pending alert states, then send all queued alerts,
+        one consolidated message per alert type.
+        
+        Returns:
+            Number of alerts delivered.
+        """
+        self.flush_states()
+        pending, self._pending = self._pending, []
+        self._state_cache.clear()
+        if not pending or not self.bot_token or not self.chat_id:
+            return 0
+        
+        # Group by alert type, keeping the order alerts were raised in
+        groups: Dict[str, List[Tuple[str, str]]] = {}
+        for target_id, alert_type, state, metrics in pending:
+            message = self._build_alert_message(target_id, alert_type, state, metrics)
+            groups.setdefault(alert_type, []).append((target_id, message))
+        
+        delivered = [
+            target_id
+            for batch_delivered in self._send_executor.map(self._send_batch, groups.values())
+            for target_id in batch_delivered
+        ]
+        self.db.set_alerts_sent(delivered, time.time())
+        
+        return len(delivered)
     
-    def _send_alert(
+    def _send_batch(self, batch: List[Tuple[str, str]]) -> List[str]:
+        """
+        Send (target_id, message) pairs as consecutive messages split under
+        Telegram's size limit, stopping at the first failed send.
+        
+        Returns:
+            Targets whose alert was delivered in full.
+        """
+        messages = [message for _, message in batch]
+        delivered: List[str] = []
+        for chunk, completed in _chunk_blocks(messages):
+            if not self._send_message(chunk):
+                break
+            delivered.extend(batch[index][0] for index in completed)
+        return delivered
+    
+    def _build_alert_message(
         self,
         target_id: str,
         alert_type: str,
         state: str,
         metrics: Optional[dict] = None,
-    ) -> bool:
-        """Send alert to Telegram."""
-        if not self.bot_token or not self.chat_id:
-            return False
-        
-        # Build message
+    ) -> str:
+        """Build alert message text."""
         site_name, page_name = target_id.split(':', 1)
+        emoji, title = _ALERT_STYLE.get(alert_type, ('⚠️', alert_type))
         
-        if alert_type == 'DOWN':
-            emoji = '🔴'
-            title = 'DOWN'
-        elif alert_type == 'SLOW':
-            emoji = '🟠'
-            title = 'SLOW'
-        elif alert_type == 'RECOVERED':
-            emoji = '🟢'
-            title = 'RECOVERED'
-        else:
-            emoji = '⚠️'
-            title = alert_type
-        
-        message = f"{emoji} {title}\n"
-        message += f"Site: {site_name}\n"
-        message += f"Page: {page_name}\n"
-        message += f"State: {state}\n"
+        parts = [
+            f"{emoji} {title}",
+            f"Site: {site_name}",
+            f"Page: {page_name}",
+            f"State: {state}",
+        ]
         
         if metrics:
             if metrics.get('url'):
-                message += f"URL: {metrics['url']}\n"
+                parts.append(f"URL: {metrics['url']}")
             if metrics.get('http_code'):
-                message += f"HTTP: {metrics['http_code']}\n"
+                parts.append(f"HTTP: {metrics['http_code']}")
             if metrics.get('ttfb') is not None:
-                message += f"TTFB: {metrics['ttfb']:.3f}s\n"
+                parts.append(f"TTFB: {metrics['ttfb']:.3f}s")
             if metrics.get('total') is not None:
-                message += f"Total: {metrics['total']:.3f}s\n"
+                parts.append(f"Total: {metrics['total']:.3f}s")
             if metrics.get('error'):
-                message += f"Error: {metrics['error']}\n"
+                parts.append(f"Error: {metrics['error']}")
         
-        # Send via Telegram Bot API
-        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+        return '\n'.join(parts) + '\n'
+    
+    def _send_message(self, text: str, parse_mode: Optional[str] = None) -> bool:
+        """Send message to Telegram, honoring retry_after on HTTP 429."""
         data = {
             'chat_id': self.chat_id,
-            'text': message,
+            'text': text,
         }
+        if parse_mode:
+            data['parse_mode'] = parse_mode
         
         try:
-            response = requests.post(url, json=data, timeout=10)
+            response = self._session().post(self._api_url, json=data, timeout=10)
+            if response.status_code == 429:
+                # Flood limit: wait as long as Telegram asks, then retry once
+                retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+                time.sleep(retry_after)
+                response = self._session().post(self._api_url, json=data, timeout=10)
             response.raise_for_status()
             result = response.json()
             if not result.get('ok'):
@@ -197,7 +363,7 @@ class AlertManager:
                 return False
             return True
         except Exception as e:
-            print(f"Failed to send Telegram alert: {e}", file=sys.stderr)
+            print(f"Failed to send Telegram message: {e}", file=sys.stderr)
             return False
     
     def send_daily_reminder(self) -> bool:
@@ -211,14 +377,22 @@ class AlertManager:
         if not self.config:
             return False
         
+        # Nothing to remind about; skip the per-page lookups
+        if self.db.count_down_targets() == 0:
+            return False
+        
         # Get all DOWN sites
-        down_sites = []
-        for page in self.config.pages:
-            alert_state = self.db.get_alert_state(page.target_id)
-            if alert_state and alert_state.last_state == 'DOWN':
-                last_check = self.db.get_last_check(page.target_id)
-                if last_check:
-                    down_sites.append((page.target_id, page.url, last_check))
+        pages = self.config.pages
+        target_ids = [page.target_id for page in pages]
+        states = self.db.get_alert_states_bulk(target_ids)
+        checks = self.db.get_last_checks_bulk(target_ids)
+        down_sites = [
+            (page.target_id, page.url, checks[page.target_id])
+            for page in pages
+            if page.target_id in states
+            and states[page.target_id].last_state == 'DOWN'
+            and page.target_id in checks
+        ]
         
         if not down_sites:
             return False
@@ -226,7 +400,7 @@ class AlertManager:
         # Build reminder message
         message = "⏰ <b>Напоминание: Сайты в статусе DOWN</b>\n\n"
         
-        for target_id, url, check in down_sites:
+        for _, url, check in down_sites:
             emoji = '🔴'
             message += f"{emoji} {url}"
             if check.http_code:
@@ -237,20 +411,4 @@ class AlertManager:
         
         message += f"\n<b>Всего:</b> {len(down_sites)} сайт(ов) в статусе DOWN"
         
-        # Send via Telegram Bot API
-        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-        data = {
-            'chat_id': self.chat_id,
-            'text': message,
-            'parse_mode': 'HTML',
-        }
-        
-        try:
-            response = requests.post(url, json=data, timeout=10)
-            response.raise_for_status()
-            result = response.json()
-            return result.get('ok', False)
-        except Exception as e:
-            print(f"Failed to send daily reminder: {e}", file=sys.stderr)
-            return False
-
+        return self._send_message(message, parse_mode='HTML')
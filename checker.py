@@ -1,10 +1,27 @@
 """Page checker using curl with metrics extraction."""
 import subprocess
-from typing import Optional
+from typing import List, Optional
 from dataclasses import dataclass
 from config import PageConfig, Defaults, AlertProfile
 
 
+# curl --write-out format: http_code|time_namelookup|time_connect|
+# time_appconnect|time_starttransfer|time_total|size_download
+# %{stderr} sends it to stderr so stdout carries only the response body.
+CURL_WRITE_OUT = (
+    '%{stderr}'
+    '\n'
+    '%{http_code}|'
+    '%{time_namelookup}|'
+    '%{time_connect}|'
+    '%{time_appconnect}|'
+    '%{time_starttransfer}|'
+    '%{time_total}|'
+    '%{size_download}'
+    '\n'
+)
+
+
 @dataclass
 class CheckMetrics:
     """Metrics from curl check."""
@@ -16,7 +33,7 @@ class CheckMetrics:
     total: Optional[float] = None
     size: Optional[int] = None
     error: Optional[str] = None
-    body: Optional[str] = None
+    body: Optional[bytes] = None
 
 
 class PageChecker:
@@ -27,6 +44,8 @@ class PageChecker:
         self.page = page
         self.defaults = defaults
         self.alert_profile = alert_profile
+        self._cmd = self._build_curl_command()
+        self._token_bytes = page.token.encode('utf-8')
     
     def check(self) -> tuple[bool, str, CheckMetrics]:
         """
@@ -45,11 +64,11 @@ class PageChecker:
         
         # Check HTTP code
         if metrics.http_code not in self.page.expect_http:
-            metrics.error = f"HTTP {metrics.http_code} not in allowed list {self.page.expect_http}"
+            metrics.error = f"HTTP {metrics.http_code} not in allowed list {sorted(self.page.expect_http)}"
             return False, 'DOWN', metrics
         
         # Check HTML marker
-        if not metrics.body or self.page.token not in metrics.body:
+        if not metrics.body or self._token_bytes not in metrics.body:
             metrics.error = "HTML marker not found"
             return False, 'DOWN', metrics
         
@@ -65,77 +84,55 @@ class PageChecker:
         else:
             return True, 'OK', metrics
     
-    def _run_curl(self) -> CheckMetrics:
-        """Run curl and extract metrics."""
-        metrics = CheckMetrics()
-        
-        # Build curl command with format string for metrics
-        # Format: http_code|time_namelookup|time_connect|time_appconnect|time_starttransfer|time_total|size_download
-        format_string = (
-            '\n'
-            '%{http_code}|'
-            '%{time_namelookup}|'
-            '%{time_connect}|'
-            '%{time_appconnect}|'
-            '%{time_starttransfer}|'
-            '%{time_total}|'
-            '%{size_download}'
-            '\n'
-        )
-        
+    def _build_curl_command(self) -> List[str]:
+        """Build curl argv for this page."""
         cmd = [
             'curl',
             '-s',  # silent
             '-S',  # show errors
-            '-L',  # follow redirects
-            '--compressed',  # accept compressed
-            '-w', format_string,
+        ]
+        
+        if self.defaults.follow_redirects:
+            cmd.append('-L')  # follow redirects
+        
+        if self.defaults.compressed:
+            cmd.append('--compressed')  # accept compressed
+        
+        cmd += [
+            '-w', CURL_WRITE_OUT,
             '--max-time', str(self.defaults.timeout_sec),
             '--connect-timeout', str(self.defaults.timeout_sec),
             '-H', f'User-Agent: {self.defaults.user_agent}',
             self.page.url,
         ]
-        
-        if not self.defaults.follow_redirects:
-            cmd.remove('-L')
-        
-        if not self.defaults.compressed:
-            cmd.remove('--compressed')
+        return cmd
+    
+    def _run_curl(self) -> CheckMetrics:
+        """Run curl and extract metrics."""
+        metrics = CheckMetrics()
         
         try:
             result = subprocess.run(
-                cmd,
+                self._cmd,
                 capture_output=True,
-                text=True,
                 timeout=self.defaults.timeout_sec + 5,
             )
             
-            # Parse output
-            # curl outputs: body\nmetrics_line\n
-            output = result.stdout
-            lines = output.rstrip().split('\n')
-            
-            if not lines:
-                metrics.error = "Empty response from curl"
-                return metrics
+            # Body stays raw bytes; only curl's short stderr is decoded
+            stderr = result.stderr.decode('utf-8', errors='replace')
             
-            # Last non-empty line should be metrics
-            metrics_line = None
-            for line in reversed(lines):
-                if line.strip() and '|' in line:
-                    metrics_line = line
-                    break
+            # Parse output
+            # curl writes the body to stdout and, after any error
+            # message, the metrics line to stderr: errors\nmetrics_line\n
+            curl_error, _, metrics_line = stderr.rstrip().rpartition('\n')
+            curl_error = curl_error.strip()
             
-            if not metrics_line:
+            if '|' not in metrics_line:
                 metrics.error = "Failed to extract metrics from curl output"
-                if result.stderr:
-                    metrics.error += f": {result.stderr}"
+                if stderr:
+                    metrics.error += f": {stderr}"
                 return metrics
             
-            # Body is everything before the metrics line
-            metrics_idx = lines.index(metrics_line) if metrics_line in lines else len(lines) - 1
-            body = '\n'.join(lines[:metrics_idx]) if metrics_idx > 0 else ''
-            
             # Parse metrics: http_code|dns|connect|tls|ttfb|total|size
             parts = metrics_line.split('|')
             if len(parts) >= 7:
@@ -154,13 +151,13 @@ class PageChecker:
                 metrics.error = f"Invalid metrics format: {metrics_line}"
                 return metrics
             
-            metrics.body = body
+            metrics.body = result.stdout
             
             # Check for curl errors
             if result.returncode != 0:
                 metrics.error = f"curl exit code {result.returncode}"
-                if result.stderr:
-                    metrics.error += f": {result.stderr}"
+                if curl_error:
+                    metrics.error += f": {curl_error}"
             
         except subprocess.TimeoutExpired:
             metrics.error = f"Timeout after {self.defaults.timeout_sec}s"
@@ -1,9 +1,41 @@
 """Configuration loader for mini-monitor system."""
+import hashlib
 import os
+import pickle
+import tempfile
 import yaml
-from typing import Dict, List, Any, Optional
+from typing import Dict, FrozenSet, List, Any, Optional
 from dataclasses import dataclass
 
+try:
+    # libyaml-backed loader is several times faster when available
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Parsed configuration is cached in this file next to the database (not in a
+# shared temp directory), keyed by the YAML file's mtime and size and by
+# this module's source
+CACHE_FILE_NAME = 'targets.cache.pkl'
+
+
+def _source_digest() -> str:
+    """Hash of this module's source: a change to the parser or dataclasses invalidates the cache."""
+    with open(__file__, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+# Part of the cache key, computed once per process
+_SOURCE_DIGEST = _source_digest()
+
+
+def _default_cache_path() -> str:
+    """Cache path in the database directory, resolving DB_PATH like the entry points do."""
+    db_path = os.getenv('DB_PATH', '/app/data/monitor.db')
+    if not os.path.isabs(db_path):
+        db_path = os.path.join('/app/data', db_path)
+    return os.path.join(os.path.dirname(db_path), CACHE_FILE_NAME)
+
 
 @dataclass
 class AlertProfile:
@@ -23,10 +55,12 @@ class PageConfig:
     path: str
     every_sec: int
     token: str
-    expect_http: List[int]
+    expect_http: FrozenSet[int]
     alert_profile: str
     site_name: str
     base_url: str
+    profile: Optional[AlertProfile] = None  # resolved from alert_profile at load
+    check_offset: int = 0  # first-check offset within every_sec, set at load
 
     @property
     def url(self) -> str:
@@ -54,10 +88,28 @@ class Defaults:
 class Config:
     """Main configuration class."""
     
-    def __init__(self, config_path: str = "targets.yml"):
-        """Load configuration from YAML file."""
+    def __init__(self, config_path: str = "targets.yml", cache_path: Optional[str] = None):
+        """Load configuration from YAML file, reusing a cached parse if unchanged."""
+        self.cache_path = cache_path or os.getenv('CONFIG_CACHE_PATH') or _default_cache_path()
+        
+        stat = os.stat(config_path)
+        cache_key = (
+            _SOURCE_DIGEST,
+            os.path.abspath(config_path),
+            stat.st_mtime_ns,
+            stat.st_size,
+        )
+        
+        if self._load_cache(cache_key):
+            return
+        
+        self._load_yaml(config_path)
+        self._save_cache(cache_key)
+    
+    def _load_yaml(self, config_path: str):
+        """Parse and validate the YAML configuration."""
         with open(config_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
+            data = yaml.load(f, Loader=SafeLoader)
         
         # Load defaults
         defaults_data = data.get('defaults', {})
@@ -90,25 +142,78 @@ class Config:
             base_url = site_data['base']
             
             for page_data in site_data.get('pages', []):
+                alert_profile = page_data.get('alert_profile', 'default')
                 page = PageConfig(
                     name=page_data['name'],
                     path=page_data['path'],
                     every_sec=int(page_data['every_sec']),
                     token=page_data['token'],
-                    expect_http=page_data.get('expect_http', [200]),
-                    alert_profile=page_data.get('alert_profile', 'default'),
+                    expect_http=frozenset(page_data.get('expect_http', [200])),
+                    alert_profile=alert_profile,
                     site_name=site_name,
                     base_url=base_url,
+                    profile=self.alert_profiles.get(alert_profile),
                 )
+                page.check_offset = self._check_offset(page)
+                
+                # Validate alert profile
+                if page.profile is None:
+                    raise ValueError(
+                        f"Alert profile '{page.alert_profile}' not found for page "
+                        f"{page.target_id}"
+                    )
+                
                 self.pages.append(page)
+    
+    @staticmethod
+    def _check_offset(page: PageConfig) -> int:
+        """Stable hash-based offset that spreads first checks over every_sec."""
+        digest = hashlib.md5(page.target_id.encode()).hexdigest()
+        return int(digest, 16) % page.every_sec
+    
+    def _load_cache(self, cache_key: tuple) -> bool:
+        """Load parsed config from cache if it matches cache_key."""
+        try:
+            # Only trust a cache file written by this user
+            if os.stat(self.cache_path).st_uid != os.getuid():
+                return False
+            with open(self.cache_path, 'rb') as f:
+                key, defaults, alert_profiles, pages = pickle.load(f)
+        except Exception:
+            return False
+        
+        if key != cache_key:
+            return False
         
-        # Validate alert profiles
-        for page in self.pages:
-            if page.alert_profile not in self.alert_profiles:
-                raise ValueError(
-                    f"Alert profile '{page.alert_profile}' not found for page "
-                    f"{page.target_id}"
+        self.defaults = defaults
+        self.alert_profiles = alert_profiles
+        self.pages = pages
+        return True
+    
+    def _save_cache(self, cache_key: tuple):
+        """Write parsed config to cache; failures are not fatal."""
+        tmp_path = None
+        try:
+            # Unpredictable name, created exclusively with mode 0600
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(self.cache_path) or '.',
+                prefix=f"{os.path.basename(self.cache_path)}.",
+                suffix='.tmp',
+            )
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(
+                    (cache_key, self.defaults, self.alert_profiles, self.pages),
+                    f,
+                    protocol=5,
                 )
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            if tmp_path is None:
+                return
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
     
     def get_alert_profile(self, profile_name: str) -> AlertProfile:
         """Get alert profile by name."""
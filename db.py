@@ -1,12 +1,186 @@
 """Database operations for mini-monitor system."""
+import queue
 import sqlite3
+import threading
 import time
-from typing import Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from itertools import groupby
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 
-@dataclass
+# Statement cache size; comfortably above the number of distinct queries
+# below, so each one is parsed and planned once per connection
+STATEMENT_CACHE_SIZE = 256
+
+# How long a connection waits for a competing writer instead of failing
+# with SQLITE_BUSY
+BUSY_TIMEOUT_MS = 5000
+
+# Schema setup may have to wait for another process rebuilding a large
+# checks table to WITHOUT ROWID, so it waits far longer than normal writes
+SCHEMA_BUSY_TIMEOUT_MS = 600000
+
+# Rows are clustered by primary key: checks by (target_id, timestamp), so
+# the recent checks of a target are adjacent on disk and the latest-check
+# queries are answered from the table B-tree without a separate index
+_SQL_CREATE_CHECKS = """
+    CREATE TABLE IF NOT EXISTS checks (
+        timestamp REAL NOT NULL,
+        target_id TEXT NOT NULL,
+        site_name TEXT NOT NULL,
+        page_name TEXT NOT NULL,
+        url TEXT NOT NULL,
+        ok INTEGER NOT NULL,
+        state TEXT NOT NULL,
+        http_code INTEGER,
+        dns REAL,
+        connect REAL,
+        tls REAL,
+        ttfb REAL,
+        total REAL,
+        size INTEGER,
+        error TEXT,
+        PRIMARY KEY (target_id, timestamp)
+    ) WITHOUT ROWID
+"""
+
+# Small key/value store for bookkeeping such as maintenance timestamps
+_SQL_CREATE_KV = """
+    CREATE TABLE IF NOT EXISTS kv (
+        key TEXT PRIMARY KEY,
+        value
+    ) WITHOUT ROWID
+"""
+
+_SQL_CREATE_ALERT_STATE = """
+    CREATE TABLE IF NOT EXISTS alert_state (
+        target_id TEXT PRIMARY KEY,
+        last_state TEXT NOT NULL,
+        bad_since_ts REAL,
+        last_sent_ts REAL,
+        consecutive_failures INTEGER DEFAULT 0,
+        consecutive_successes INTEGER DEFAULT 0
+    ) WITHOUT ROWID
+"""
+
+# Queries are kept as constants so every call passes the same SQL text and
+# hits the connection's statement cache
+_SQL_LAST_CHECK_TIME = """
+    SELECT MAX(timestamp) AS last_ts
+    FROM checks
+    WHERE target_id = ?
+"""
+
+_SQL_LAST_CHECK_TIMES = """
+    SELECT target_id, MAX(timestamp) AS last_ts
+    FROM checks
+    GROUP BY target_id
+"""
+
+_SQL_LAST_CHECK = """
+    SELECT * FROM checks
+    WHERE target_id = ?
+    ORDER BY timestamp DESC
+    LIMIT 1
+"""
+
+# {placeholders} is filled with one '?' per target id
+_SQL_LAST_CHECKS_BULK = """
+    SELECT c.* FROM checks c
+    JOIN (
+        SELECT target_id, MAX(timestamp) AS last_ts
+        FROM checks
+        WHERE target_id IN ({placeholders})
+        GROUP BY target_id
+    ) latest
+    ON c.target_id = latest.target_id AND c.timestamp = latest.last_ts
+"""
+
+_SQL_LATEST_CHECKS = """
+    SELECT c.* FROM checks c
+    JOIN (
+        SELECT target_id, MAX(timestamp) AS last_ts
+        FROM checks
+        GROUP BY target_id
+    ) latest
+    ON c.target_id = latest.target_id AND c.timestamp = latest.last_ts
+"""
+
+_SQL_RECENT_CHECKS = """
+    SELECT * FROM checks
+    WHERE target_id = ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+"""
+
+# Rows come back grouped by target, newest first within each target
+_SQL_RECENT_CHECKS_ALL = """
+    SELECT * FROM (
+        SELECT *, ROW_NUMBER() OVER (
+            PARTITION BY target_id ORDER BY timestamp DESC
+        ) AS rn
+        FROM checks
+    )
+    WHERE rn <= ?
+    ORDER BY target_id, timestamp DESC
+"""
+
+# A second result for the same target and timestamp replaces the first
+_SQL_SAVE_CHECK = """
+    INSERT OR REPLACE INTO checks (
+        timestamp, target_id, site_name, page_name, url,
+        ok, state, http_code, dns, connect, tls, ttfb, total, size, error
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_CLEANUP_CHECKS = """
+    DELETE FROM checks WHERE timestamp < ?
+"""
+
+_SQL_GET_KV = """
+    SELECT value FROM kv WHERE key = ?
+"""
+
+_SQL_SET_KV = """
+    INSERT INTO kv (key, value) VALUES (?, ?)
+    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+"""
+
+_SQL_GET_ALERT_STATE = """
+    SELECT * FROM alert_state WHERE target_id = ?
+"""
+
+# {placeholders} is filled with one '?' per target id
+_SQL_GET_ALERT_STATES_BULK = """
+    SELECT * FROM alert_state WHERE target_id IN ({placeholders})
+"""
+
+_SQL_COUNT_DOWN = """
+    SELECT COUNT(*) AS down_count FROM alert_state WHERE last_state = 'DOWN'
+"""
+
+# A NULL bad_since_ts or last_sent_ts keeps the stored value
+_SQL_UPSERT_ALERT = """
+    INSERT INTO alert_state (
+        target_id, last_state, bad_since_ts, last_sent_ts,
+        consecutive_failures, consecutive_successes
+    ) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(target_id) DO UPDATE SET
+        last_state = excluded.last_state,
+        bad_since_ts = COALESCE(excluded.bad_since_ts, alert_state.bad_since_ts),
+        last_sent_ts = COALESCE(excluded.last_sent_ts, alert_state.last_sent_ts),
+        consecutive_failures = excluded.consecutive_failures,
+        consecutive_successes = excluded.consecutive_successes
+"""
+
+_SQL_SET_ALERT_SENT = """
+    UPDATE alert_state SET last_sent_ts = ? WHERE target_id = ?
+"""
+
+
+@dataclass(slots=True, frozen=True)
 class CheckResult:
     """Result of a single check."""
     timestamp: float
@@ -26,7 +200,7 @@ class CheckResult:
     error: Optional[str]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AlertState:
     """Current alert state for a target."""
     target_id: str
@@ -38,85 +212,97 @@ class AlertState:
 
 
 class Database:
-    """Database manager for SQLite."""
+    """
+    Database manager for SQLite.
+    
+    The database runs in WAL mode, so the monitor (writer) and the Telegram
+    bot can read and write concurrently without blocking each other. A
+    process that only reads can avoid the write lock entirely by opening
+    the file read-only (sqlite3.connect("file:<path>?mode=ro", uri=True)).
+    
+    With read_pool_size > 0, reads go through a pool of that many read-only
+    connections and never wait on the write connection; writes always use
+    self.conn. Pooled reads only see committed data.
+    """
     
-    def __init__(self, db_path: str = "monitor.db"):
+    def __init__(self, db_path: str = "monitor.db", read_pool_size: int = 0):
         """Initialize database connection and create tables."""
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Autocommit mode: each statement commits on its own unless it runs
+        # inside a transaction (_transaction() or batch())
+        self.conn = sqlite3.connect(
+            db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            # The first process to open an old database migrates it under the
+            # write lock; the others wait for it here instead of failing
+            timeout=SCHEMA_BUSY_TIMEOUT_MS / 1000,
+        )
         self.conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self._configure()
         self._create_tables()
-    
-    def _create_tables(self):
-        """Create database tables if they don't exist."""
-        cursor = self.conn.cursor()
+        # Schema is in place: back to the normal wait for a competing writer
+        self.conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
         
-        # Table for check results
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS checks (
-                timestamp REAL NOT NULL,
-                target_id TEXT NOT NULL,
-                site_name TEXT NOT NULL,
-                page_name TEXT NOT NULL,
-                url TEXT NOT NULL,
-                ok INTEGER NOT NULL,
-                state TEXT NOT NULL,
-                http_code INTEGER,
-                dns REAL,
-                connect REAL,
-                tls REAL,
-                ttfb REAL,
-                total REAL,
-                size INTEGER,
-                error TEXT
-            )
-        """)
-        
-        # Index for faster queries
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_checks_target_timestamp 
-            ON checks(target_id, timestamp DESC)
-        """)
-        
-        # Table for alert states
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS alert_state (
-                target_id TEXT PRIMARY KEY,
-                last_state TEXT NOT NULL,
-                bad_since_ts REAL,
-                last_sent_ts REAL,
-                consecutive_failures INTEGER DEFAULT 0,
-                consecutive_successes INTEGER DEFAULT 0
-            )
-        """)
-        
-        self.conn.commit()
+        # Read-only connections are opened after the tables exist
+        self._readers: Optional[queue.Queue] = None
+        if read_pool_size > 0:
+            self._readers = queue.Queue(maxsize=read_pool_size)
+            for _ in range(read_pool_size):
+                self._readers.put(self._open_reader())
     
-    def get_last_check_time(self, target_id: str) -> Optional[float]:
-        """Get timestamp of last check for a target."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT MAX(timestamp) as last_ts
-            FROM checks
-            WHERE target_id = ?
-        """, (target_id,))
-        row = cursor.fetchone()
-        return row['last_ts'] if row and row['last_ts'] else None
+    def _configure(self):
+        """Apply connection PRAGMAs."""
+        # Let incremental_vacuum() return freed pages to the OS. This only
+        # takes effect on a new database, before any table is created
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL lets readers proceed during writes; NORMAL sync is durable in WAL
+        # mode and skips the fsync on every commit
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # Truncate the WAL file back to 64 MiB after checkpoints
+        self.conn.execute("PRAGMA journal_size_limit=67108864")
+        # 64 MiB page cache, in-memory temp tables, 256 MiB memory map
+        self.conn.execute("PRAGMA cache_size=-64000")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA mmap_size=268435456")
     
-    def get_last_check(self, target_id: str) -> Optional[CheckResult]:
-        """Get last check result for a target."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT * FROM checks
-            WHERE target_id = ?
-            ORDER BY timestamp DESC
-            LIMIT 1
-        """, (target_id,))
-        row = cursor.fetchone()
-        
-        if not row:
-            return None
+    def _open_reader(self) -> sqlite3.Connection:
+        """Open a read-only connection for the read pool."""
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        # Refuse writes even if one slips through; serve hot pages from the
+        # memory map with a smaller per-connection cache than the writer's
+        conn.execute("PRAGMA query_only=1")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-32000")
+        return conn
+    
+    @contextmanager
+    def _reader(self):
+        """Borrow a connection for reading: a pooled one if configured."""
+        if self._readers is None:
+            yield self.conn
+            return
         
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+    
+    @staticmethod
+    def _row_to_check(row: sqlite3.Row) -> CheckResult:
+        """Build CheckResult from a checks row."""
         return CheckResult(
             timestamp=row['timestamp'],
             target_id=row['target_id'],
@@ -135,52 +321,189 @@ class Database:
             error=row['error'],
         )
     
+    @staticmethod
+    def _row_to_alert_state(row: sqlite3.Row) -> AlertState:
+        """Build AlertState from an alert_state row."""
+        return AlertState(
+            target_id=row['target_id'],
+            last_state=row['last_state'],
+            bad_since_ts=row['bad_since_ts'],
+            last_sent_ts=row['last_sent_ts'],
+            consecutive_failures=row['consecutive_failures'],
+            consecutive_successes=row['consecutive_successes'],
+        )
+    
+    @contextmanager
+    def batch(self):
+        """
+        Run several writes in one transaction: committed on exit, rolled back
+        on error.
+        
+        The connection lock is held from BEGIN IMMEDIATE to COMMIT, so only
+        the calling thread's writes join the batch; writes from other
+        threads wait for it to end instead of landing inside it.
+        """
+        with self._transaction():
+            yield
+    
+    @contextmanager
+    def _transaction(self):
+        """Run statements in one transaction, joining a batch this thread holds open."""
+        # The lock is held until the transaction ends, so an open transaction
+        # seen here always belongs to the calling thread
+        with self._lock:
+            if self.conn.in_transaction:
+                yield
+                return
+            
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+    
+    def _create_tables(self):
+        """Create database tables if they don't exist, migrating old layouts."""
+        with self._transaction():
+            self._migrate_to_without_rowid('checks', _SQL_CREATE_CHECKS)
+            self._migrate_to_without_rowid('alert_state', _SQL_CREATE_ALERT_STATE)
+            
+            cursor = self.conn.cursor()
+            cursor.execute(_SQL_CREATE_CHECKS)
+            cursor.execute(_SQL_CREATE_ALERT_STATE)
+            cursor.execute(_SQL_CREATE_KV)
+            
+            # Index for retention cleanup, which deletes by timestamp alone
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_checks_ts
+                ON checks(timestamp)
+            """)
+            
+            # Index for state lookups (e.g. count of DOWN targets)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_alert_state_last_state
+                ON alert_state(last_state)
+            """)
+    
+    def _migrate_to_without_rowid(self, table: str, create_sql: str):
+        """Rebuild a table created with a rowid using its WITHOUT ROWID schema."""
+        row = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table,),
+        ).fetchone()
+        if row is None or 'WITHOUT ROWID' in row['sql'].upper():
+            return
+        
+        old_table = f"{table}_old"
+        columns = ', '.join(
+            info['name'] for info in self.conn.execute(f"PRAGMA table_info({table})")
+        )
+        
+        # Indexes follow the renamed table and are dropped with it
+        self.conn.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+        self.conn.execute(create_sql)
+        # Old checks rows may repeat (target_id, timestamp); keep the first
+        self.conn.execute(
+            f"INSERT OR IGNORE INTO {table} ({columns}) SELECT {columns} FROM {old_table}"
+        )
+        self.conn.execute(f"DROP TABLE {old_table}")
+        print(f"Migrated table {table} to WITHOUT ROWID")
+    
+    def get_last_check_time(self, target_id: str) -> Optional[float]:
+        """Get timestamp of last check for a target."""
+        with self._reader() as conn:
+            row = conn.execute(_SQL_LAST_CHECK_TIME, (target_id,)).fetchone()
+        return row['last_ts'] if row and row['last_ts'] else None
+    
+    def get_last_check_times(self) -> Dict[str, float]:
+        """Get timestamp of last check for every target in one query."""
+        with self._reader() as conn:
+            rows = conn.execute(_SQL_LAST_CHECK_TIMES).fetchall()
+        return {row['target_id']: row['last_ts'] for row in rows}
+    
+    def get_last_check(self, target_id: str) -> Optional[CheckResult]:
+        """Get last check result for a target."""
+        with self._reader() as conn:
+            row = conn.execute(_SQL_LAST_CHECK, (target_id,)).fetchone()
+        
+        if not row:
+            return None
+        
+        return self._row_to_check(row)
+    
+    def get_last_checks_bulk(self, target_ids: List[str]) -> Dict[str, CheckResult]:
+        """Get last check result for each of the given targets in one query."""
+        if not target_ids:
+            return {}
+        
+        sql = _SQL_LAST_CHECKS_BULK.format(placeholders=','.join('?' * len(target_ids)))
+        with self._reader() as conn:
+            rows = conn.execute(sql, target_ids).fetchall()
+        
+        return {row['target_id']: self._row_to_check(row) for row in rows}
+    
+    def get_latest_checks_by_target(self) -> Dict[str, CheckResult]:
+        """Get last check result for every target in one query."""
+        with self._reader() as conn:
+            rows = conn.execute(_SQL_LATEST_CHECKS).fetchall()
+        
+        return {row['target_id']: self._row_to_check(row) for row in rows}
+    
     def save_check(self, result: CheckResult):
         """Save a check result to the database."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO checks (
-                timestamp, target_id, site_name, page_name, url,
-                ok, state, http_code, dns, connect, tls, ttfb, total, size, error
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            result.timestamp,
-            result.target_id,
-            result.site_name,
-            result.page_name,
-            result.url,
-            1 if result.ok else 0,
-            result.state,
-            result.http_code,
-            result.dns,
-            result.connect,
-            result.tls,
-            result.ttfb,
-            result.total,
-            result.size,
-            result.error,
-        ))
-        self.conn.commit()
+        self.save_checks([result])
+    
+    def save_checks(self, results: List[CheckResult]):
+        """Save check results with one executemany in one transaction."""
+        with self._transaction():
+            self.conn.executemany(_SQL_SAVE_CHECK, (
+                (
+                    result.timestamp,
+                    result.target_id,
+                    result.site_name,
+                    result.page_name,
+                    result.url,
+                    1 if result.ok else 0,
+                    result.state,
+                    result.http_code,
+                    result.dns,
+                    result.connect,
+                    result.tls,
+                    result.ttfb,
+                    result.total,
+                    result.size,
+                    result.error,
+                )
+                for result in results
+            ))
     
     def get_alert_state(self, target_id: str) -> Optional[AlertState]:
         """Get current alert state for a target."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT * FROM alert_state WHERE target_id = ?
-        """, (target_id,))
-        row = cursor.fetchone()
+        with self._reader() as conn:
+            row = conn.execute(_SQL_GET_ALERT_STATE, (target_id,)).fetchone()
         
         if not row:
             return None
         
-        return AlertState(
-            target_id=row['target_id'],
-            last_state=row['last_state'],
-            bad_since_ts=row['bad_since_ts'],
-            last_sent_ts=row['last_sent_ts'],
-            consecutive_failures=row['consecutive_failures'],
-            consecutive_successes=row['consecutive_successes'],
-        )
+        return self._row_to_alert_state(row)
+    
+    def get_alert_states_bulk(self, target_ids: List[str]) -> Dict[str, AlertState]:
+        """Get alert states for the given targets in one query."""
+        if not target_ids:
+            return {}
+        
+        sql = _SQL_GET_ALERT_STATES_BULK.format(placeholders=','.join('?' * len(target_ids)))
+        with self._reader() as conn:
+            rows = conn.execute(sql, target_ids).fetchall()
+        
+        return {row['target_id']: self._row_to_alert_state(row) for row in rows}
+    
+    def count_down_targets(self) -> int:
+        """Count targets whose alert state is DOWN."""
+        with self._reader() as conn:
+            return conn.execute(_SQL_COUNT_DOWN).fetchone()['down_count']
     
     def update_alert_state(
         self,
@@ -191,92 +514,96 @@ class Database:
         consecutive_failures: int = 0,
         consecutive_successes: int = 0,
     ):
-        """Update alert state for a target."""
-        cursor = self.conn.cursor()
+        """
+        Insert or update alert state for a target.
         
-        # Get current state
-        current = self.get_alert_state(target_id)
+        A None bad_since_ts or last_sent_ts keeps the stored value.
+        """
+        self.update_alert_states_many([AlertState(
+            target_id=target_id,
+            last_state=new_state,
+            bad_since_ts=bad_since_ts,
+            last_sent_ts=last_sent_ts,
+            consecutive_failures=consecutive_failures,
+            consecutive_successes=consecutive_successes,
+        )])
+    
+    def update_alert_states_many(self, states: List[AlertState]):
+        """
+        Insert or update alert states in one transaction.
         
-        if current:
-            # Update existing
-            cursor.execute("""
-                UPDATE alert_state
-                SET last_state = ?,
-                    bad_since_ts = ?,
-                    last_sent_ts = ?,
-                    consecutive_failures = ?,
-                    consecutive_successes = ?
-                WHERE target_id = ?
-            """, (
-                new_state,
-                bad_since_ts if bad_since_ts is not None else current.bad_since_ts,
-                last_sent_ts if last_sent_ts is not None else current.last_sent_ts,
-                consecutive_failures,
-                consecutive_successes,
-                target_id,
-            ))
-        else:
-            # Insert new
-            cursor.execute("""
-                INSERT INTO alert_state (
-                    target_id, last_state, bad_since_ts, last_sent_ts,
-                    consecutive_failures, consecutive_successes
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                target_id,
-                new_state,
-                bad_since_ts,
-                last_sent_ts,
-                consecutive_failures,
-                consecutive_successes,
-            ))
+        A None bad_since_ts or last_sent_ts keeps the stored value.
+        """
+        if not states:
+            return
         
-        self.conn.commit()
+        with self._transaction():
+            self.conn.executemany(_SQL_UPSERT_ALERT, [
+                (
+                    state.target_id,
+                    state.last_state,
+                    state.bad_since_ts,
+                    state.last_sent_ts,
+                    state.consecutive_failures,
+                    state.consecutive_successes,
+                )
+                for state in states
+            ])
+    
+    def set_alerts_sent(self, target_ids: List[str], sent_ts: float):
+        """Record when the last alert for each target was delivered."""
+        if not target_ids:
+            return
+        
+        with self._transaction():
+            self.conn.executemany(
+                _SQL_SET_ALERT_SENT,
+                [(sent_ts, target_id) for target_id in target_ids],
+            )
     
     def cleanup_old_checks(self, retention_days: int):
         """Delete checks older than retention_days."""
-        cursor = self.conn.cursor()
         cutoff = time.time() - (retention_days * 24 * 3600)
-        cursor.execute("""
-            DELETE FROM checks WHERE timestamp < ?
-        """, (cutoff,))
-        deleted = cursor.rowcount
-        self.conn.commit()
-        return deleted
+        return self.conn.execute(_SQL_CLEANUP_CHECKS, (cutoff,)).rowcount
+    
+    def incremental_vacuum(self, max_pages: int):
+        """Return up to max_pages free pages to the OS (auto_vacuum=INCREMENTAL only)."""
+        self.conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})").fetchall()
+    
+    def get_kv(self, key: str) -> Optional[Any]:
+        """Get a bookkeeping value by key."""
+        with self._reader() as conn:
+            row = conn.execute(_SQL_GET_KV, (key,)).fetchone()
+        return row['value'] if row else None
+    
+    def set_kv(self, key: str, value: Any):
+        """Insert or replace a bookkeeping value."""
+        with self._transaction():
+            self.conn.execute(_SQL_SET_KV, (key, value))
     
     def get_recent_checks(self, target_id: str, limit: int = 10) -> List[CheckResult]:
         """Get recent check results for a target."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT * FROM checks
-            WHERE target_id = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        """, (target_id, limit))
+        with self._reader() as conn:
+            rows = conn.execute(_SQL_RECENT_CHECKS, (target_id, limit)).fetchall()
         
-        results = []
-        for row in cursor.fetchall():
-            results.append(CheckResult(
-                timestamp=row['timestamp'],
-                target_id=row['target_id'],
-                site_name=row['site_name'],
-                page_name=row['page_name'],
-                url=row['url'],
-                ok=bool(row['ok']),
-                state=row['state'],
-                http_code=row['http_code'],
-                dns=row['dns'],
-                connect=row['connect'],
-                tls=row['tls'],
-                ttfb=row['ttfb'],
-                total=row['total'],
-                size=row['size'],
-                error=row['error'],
-            ))
+        return [self._row_to_check(row) for row in rows]
+    
+    def get_recent_checks_all(self, limit_per_target: int = 10) -> Dict[str, List[CheckResult]]:
+        """Get recent check results for every target in one query."""
+        with self._reader() as conn:
+            rows = conn.execute(_SQL_RECENT_CHECKS_ALL, (limit_per_target,)).fetchall()
         
-        return results
+        return {
+            target_id: [self._row_to_check(row) for row in target_rows]
+            for target_id, target_rows in groupby(rows, key=lambda row: row['target_id'])
+        }
     
     def close(self):
-        """Close database connection."""
+        """Refresh query planner statistics and close database connections."""
+        if self._readers is not None:
+            while not self._readers.empty():
+                self._readers.get_nowait().close()
+        
+        self.conn.execute("PRAGMA optimize")
         self.conn.close()
 
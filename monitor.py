@@ -3,9 +3,8 @@
 import os
 import sys
 import time
-import hashlib
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 from dotenv import load_dotenv
 
 from config import Config, PageConfig
@@ -14,43 +13,59 @@ from checker import PageChecker
 from alerts import AlertManager
 
 
-def stable_hash(text: str) -> int:
-    """Generate stable hash for consistent offset calculation."""
-    return int(hashlib.md5(text.encode()).hexdigest(), 16)
+# Retention cleanup runs at most hourly, freed pages are returned daily
+CLEANUP_INTERVAL_SEC = 3600
+VACUUM_INTERVAL_SEC = 86400
+VACUUM_MAX_PAGES = 4096
 
+# Emoji shown next to each state in the run log
+_STATE_EMOJI = {
+    'OK': '🟢',
+    'SLOW': '🟠',
+    'DOWN': '🔴',
+}
 
-def should_check_page(page: PageConfig, db: Database, now: float) -> bool:
+
+def should_check_page(page: PageConfig, last_check_times: Dict[str, float], now: float) -> bool:
     """
     Determine if a page should be checked now.
     
-    Uses hash-based offset for even distribution.
+    Uses the page's precomputed hash-based offset for even distribution.
     """
-    last_check = db.get_last_check_time(page.target_id)
+    last_check = last_check_times.get(page.target_id)
     
     if last_check is None:
         # First check - apply offset
-        offset = stable_hash(page.target_id) % page.every_sec
-        last_check = now - offset
+        last_check = now - page.check_offset
     
     time_since_last = now - last_check
     return time_since_last >= page.every_sec
 
 
-def check_page(
-    page: PageConfig,
-    config: Config,
-    db: Database,
-    alert_manager: AlertManager,
-) -> CheckResult:
-    """Check a single page and save result."""
-    alert_profile = config.get_alert_profile(page.alert_profile)
-    checker = PageChecker(page, config.defaults, alert_profile)
+def run_maintenance(db: Database, retention_days: int, now: float):
+    """Delete expired checks and reclaim free pages when they are due."""
+    last_cleanup = db.get_kv('last_cleanup_ts') or 0
+    if now - last_cleanup >= CLEANUP_INTERVAL_SEC:
+        deleted = db.cleanup_old_checks(retention_days)
+        db.set_kv('last_cleanup_ts', now)
+        if deleted > 0:
+            print(f"Cleaned up {deleted} old check records")
+    
+    last_vacuum = db.get_kv('last_vacuum_ts') or 0
+    if now - last_vacuum >= VACUUM_INTERVAL_SEC:
+        db.incremental_vacuum(VACUUM_MAX_PAGES)
+        db.set_kv('last_vacuum_ts', now)
+
+
+def check_page(page: PageConfig, config: Config) -> CheckResult:
+    """Check a single page; the caller processes alerts and saves the result."""
+    checker = PageChecker(page, config.defaults, page.profile)
     ok, state, metrics = checker.check()
     
     now = time.time()
     
     # Create check result
-    result = CheckResult(
+    return CheckResult(
         timestamp=now,
         target_id=page.target_id,
         site_name=page.site_name,
@@ -67,27 +82,6 @@ def check_page(
         size=metrics.size,
         error=metrics.error,
     )
-    
-    # Save to database
-    db.save_check(result)
-    
-    # Process alerts
-    alert_profile = config.get_alert_profile(page.alert_profile)
-    metrics_dict = {
-        'url': page.url,
-        'http_code': metrics.http_code,
-        'ttfb': metrics.ttfb,
-        'total': metrics.total,
-        'error': metrics.error,
-    }
-    alert_manager.process_check_result(
-        page.target_id,
-        state,
-        alert_profile,
-        metrics_dict,
-    )
-    
-    return result
 
 
 def main():
@@ -119,9 +113,10 @@ def main():
     now = time.time()
     
     # Determine which pages need checking
+    last_check_times = db.get_last_check_times()
     pages_to_check: List[PageConfig] = []
     for page in config.pages:
-        if should_check_page(page, db, now):
+        if should_check_page(page, last_check_times, now):
             pages_to_check.append(page)
     
     # Limit number of checks per run
@@ -131,22 +126,21 @@ def main():
     if not pages_to_check:
         # Debug: show why no pages to check
         total_pages = len(config.pages)
-        ready_count = sum(1 for p in config.pages if should_check_page(p, db, now))
+        ready_count = sum(1 for p in config.pages if should_check_page(p, last_check_times, now))
         print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] No pages to check (ready: {ready_count}/{total_pages}, max_per_run: {config.defaults.max_checks_per_run})")
         # Still do cleanup
-        deleted = db.cleanup_old_checks(config.defaults.retention_days)
-        if deleted > 0:
-            print(f"Cleaned up {deleted} old check records")
+        run_maintenance(db, config.defaults.retention_days, now)
         db.close()
         return
     
     print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Checking {len(pages_to_check)} pages...")
     
-    # Run checks in parallel
+    # Run checks in parallel, one worker per page up to max_workers
     results: List[CheckResult] = []
-    with ThreadPoolExecutor(max_workers=config.defaults.max_workers) as executor:
+    workers = min(config.defaults.max_workers, len(pages_to_check))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
         futures = {
-            executor.submit(check_page, page, config, db, alert_manager): page
+            executor.submit(check_page, page, config): page
             for page in pages_to_check
         }
         
@@ -155,24 +149,47 @@ def main():
             try:
                 result = future.result()
                 results.append(result)
-                status_emoji = {
-                    'OK': '🟢',
-                    'SLOW': '🟠',
-                    'DOWN': '🔴',
-                }.get(result.state, '❓')
-                print(
-                    f"  {status_emoji} {result.target_id}: {result.state} "
-                    f"(TTFB: {result.ttfb:.3f}s, Total: {result.total:.3f}s)"
-                    if result.ttfb and result.total
-                    else f"  {status_emoji} {result.target_id}: {result.state}"
-                )
+                status_emoji = _STATE_EMOJI.get(result.state, '❓')
+                ttfb, total = result.ttfb, result.total
+                timings = f" (TTFB: {ttfb:.3f}s, Total: {total:.3f}s)" if ttfb and total else ""
+                print(f"  {status_emoji} {result.target_id}: {result.state}{timings}")
             except Exception as e:
                 print(f"  ❌ {page.target_id}: Error - {e}", file=sys.stderr)
     
+    # Alert states are read only now, after the network checks, so a bot
+    # check of the same target in the meantime is not overwritten
+    alert_manager.load_states([result.target_id for result in results])
+    profiles = {page.target_id: page.profile for page in pages_to_check}
+    
+    for result in results:
+        try:
+            metrics_dict = {
+                'url': result.url,
+                'http_code': result.http_code,
+                'ttfb': result.ttfb,
+                'total': result.total,
+                'error': result.error,
+            }
+            alert_manager.process_check_result(
+                result.target_id,
+                result.state,
+                profiles[result.target_id],
+                metrics_dict,
+            )
+        except Exception as e:
+            print(f"  ❌ {result.target_id}: Alert error - {e}", file=sys.stderr)
+    
+    # Write all results and alert states in one transaction. It starts only
+    # after the checks so the write lock is never held during network I/O.
+    with db.batch():
+        db.save_checks(results)
+        alert_manager.flush_states()
+    
+    # Send alerts queued above
+    alert_manager.flush_alerts()
+    
     # Cleanup old checks
-    deleted = db.cleanup_old_checks(config.defaults.retention_days)
-    if deleted > 0:
-        print(f"Cleaned up {deleted} old check records")
+    run_maintenance(db, config.defaults.retention_days, now)
     
     # Close database
     db.close()
@@ -1,14 +1,93 @@
 """Telegram bot for status queries."""
+import json
 import os
 import sys
+import threading
 import time
 import requests
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
-from config import Config
+from config import Config, PageConfig
 from db import Database, CheckResult
 from checker import PageChecker
-from alerts import AlertManager
+from alerts import AlertManager, split_message
+
+
+# Read-only connections for status queries; writes use the main connection
+READ_POOL_SIZE = 4
+
+# getUpdates long-poll: Telegram holds the request this long when idle; the
+# HTTP timeout leaves headroom for the reply
+LONG_POLL_TIMEOUT_SEC = 50
+LONG_POLL_HTTP_TIMEOUT_SEC = 60
+
+# /check replies are reused for this long; the monitor writes at most once
+# per cron tick, so a few seconds of staleness is invisible
+STATUS_CACHE_TTL_SEC = 5
+
+# /check all on this many pages or fewer finishes fast enough that the
+# "checking..." notice is just an extra message
+QUIET_CHECK_ALL_MAX_PAGES = 3
+
+# Reply to /start and /help
+_HELP_MSG = (
+    "🤖 <b>Website Monitoring Bot</b>\n\n"
+    "Доступные команды:\n"
+    "/check - показать текущий статус всех сайтов\n"
+    "/check all - проверить все сайты прямо сейчас\n"
+    "/check &lt;url&gt; - проверить конкретный сайт\n"
+    "  Пример: /check nestcentre.org\n"
+    "  Пример: /check https://nestcentre.org/\n"
+    "/help - показать эту справку"
+)
+
+# Position of each state in the summary counters; anything else counts as DOWN
+_STATE_INDEX = {'OK': 0, 'SLOW': 1}
+
+# kv key holding the last processed Telegram update_id
+LAST_UPDATE_ID_KEY = 'bot_last_update_id'
+
+# Emoji shown next to each check state; anything else is shown as DOWN
+_STATE_EMOJI = {
+    'OK': '🟢',
+    'SLOW': '🟠',
+    'DOWN': '🔴',
+}
+
+
+def _lookup_keys(url: str) -> List[str]:
+    """Keys a URL is matched by, most specific first: URL, URL without trailing slash, host:port, host."""
+    parts = urlsplit(url)
+    host = (parts.hostname or '').removeprefix('www.')
+    return [key for key in (url, url.rstrip('/'), parts.netloc.lower(), host) if key]
+
+
+def _format_summary(counts: List[int]) -> str:
+    """Format OK/SLOW/DOWN counters as the summary line."""
+    return f"<b>Итого:</b> 🟢 {counts[0]} | 🟠 {counts[1]} | 🔴 {counts[2]}"
+
+
+def _format_status_line(check: CheckResult) -> str:
+    """Format a check as: emoji + URL + HTTP + TTFB + Total + Error."""
+    parts = [_STATE_EMOJI.get(check.state, '🔴'), check.url]
+    
+    if check.http_code:
+        parts.append(f"HTTP: {check.http_code}")
+    
+    if check.ttfb is not None:
+        parts.append(f"TTFB: {check.ttfb:.3f}s")
+    
+    if check.total is not None:
+        parts.append(f"Total: {check.total:.3f}s")
+    
+    if check.error:
+        parts.append(f"Error: {check.error}")
+    
+    return ' '.join(parts)
 
 
 class TelegramBot:
@@ -20,96 +99,182 @@ class TelegramBot:
         self.db = db
         self.config = config
         self.base_url = f"https://api.telegram.org/bot{bot_token}"
-        self.last_update_id = 0
+        self.last_update_id = int(db.get_kv(LAST_UPDATE_ID_KEY) or 0)
+        # The polling loop and the command thread each keep their own
+        # keep-alive Session (Session is not thread-safe); see _session()
+        self._tls = threading.local()
+        self._sessions: List[requests.Session] = []
+        self._page_index = self._build_page_index()
+        # Built once: the AlertManager keeps its send pool and sessions, a
+        # PageChecker its prepared curl command
+        self._alert_manager = AlertManager(db, config)
+        self._checkers: Dict[str, PageChecker] = {}
+        # Command -> handler(chat_id, args)
+        self._handlers = {
+            '/check': self._handle_check,
+            '/start': self._handle_help,
+            '/help': self._handle_help,
+        }
+        # (monotonic time the status was read, rendered message)
+        self._status_cache: Optional[Tuple[float, str]] = None
+        # Slow commands (/check all, /check <url>) run here, off the polling loop
+        self._command_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bot-command')
+    
+    def _build_page_index(self) -> Dict[str, PageConfig]:
+        """Index pages by every key /check <url> can match; the first page wins."""
+        index: Dict[str, PageConfig] = {}
+        for page in self.config.pages:
+            for key in _lookup_keys(page.url):
+                index.setdefault(key, page)
+        return index
+    
+    def _checker(self, page: PageConfig) -> PageChecker:
+        """Get the cached PageChecker for a page, creating it on first use."""
+        checker = self._checkers.get(page.target_id)
+        if checker is None:
+            checker = PageChecker(page, self.config.defaults, page.profile)
+            self._checkers[page.target_id] = checker
+        return checker
+    
+    def _build_session(self) -> requests.Session:
+        """Build a keep-alive Session for one thread's Bot API calls."""
+        session = requests.Session()
+        session.headers['Connection'] = 'keep-alive'
+        # One host, and each thread makes one call at a time, so a single
+        # connection per Session is enough. Gateway errors from the Bot API
+        # are retried with backoff; read errors are not, since a timed-out
+        # sendMessage may already have been delivered
+        session.mount('https://', HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=1,
+            max_retries=Retry(
+                total=3,
+                read=False,
+                backoff_factor=0.5,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset(['GET', 'POST']),
+            ),
+        ))
+        return session
+    
+    def _session(self) -> requests.Session:
+        """Return the calling thread's Session, creating it on first use."""
+        session = getattr(self._tls, 'session', None)
+        if session is None:
+            session = self._tls.session = self._build_session()
+            self._sessions.append(session)
+        return session
+    
+    def close(self):
+        """Drop queued commands, wait for a running one, then close pooled Bot API connections."""
+        self._command_executor.shutdown(wait=True, cancel_futures=True)
+        for session in self._sessions:
+            session.close()
     
     def get_updates(self) -> list:
         """Get new updates from Telegram."""
         url = f"{self.base_url}/getUpdates"
         params = {
             'offset': self.last_update_id + 1,
-            'timeout': 10,
+            'timeout': LONG_POLL_TIMEOUT_SEC,
+            # Only messages are handled; skip every other update type
+            'allowed_updates': json.dumps(['message']),
         }
         
         try:
-            response = requests.get(url, params=params, timeout=15)
+            # api.telegram.org never redirects
+            response = self._session().get(
+                url,
+                params=params,
+                timeout=LONG_POLL_HTTP_TIMEOUT_SEC,
+                allow_redirects=False,
+            )
             response.raise_for_status()
-            result = response.json()
+            # Bot API replies are UTF-8 JSON; json.loads takes the raw bytes
+            # directly, skipping requests' encoding detection
+            result = json.loads(response.content)
             
             if result.get('ok'):
                 return result.get('result', [])
             return []
         except Exception as e:
             print(f"Error getting updates: {e}", file=sys.stderr)
+            # Back off instead of spinning while the API is unreachable
+            time.sleep(5)
             return []
     
-    def send_message(self, chat_id: str, text: str) -> bool:
-        """Send message to chat."""
+    def send_message(self, chat_id: str, text: str, parse_mode: Optional[str] = 'HTML') -> bool:
+        """Send message to chat; pass parse_mode=None for text without markup."""
         url = f"{self.base_url}/sendMessage"
         data = {
             'chat_id': chat_id,
             'text': text,
-            'parse_mode': 'HTML',
         }
+        if parse_mode:
+            data['parse_mode'] = parse_mode
+        
+        # Compact UTF-8 body: Cyrillic and emoji would otherwise be sent as
+        # 6-12 byte \uXXXX escapes
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
         
         try:
-            response = requests.post(url, json=data, timeout=10)
+            response = self._session().post(
+                url,
+                data=body,
+                headers={'Content-Type': 'application/json'},
+                timeout=10,
+                allow_redirects=False,
+            )
             response.raise_for_status()
-            result = response.json()
+            result = json.loads(response.content)
             return result.get('ok', False)
         except Exception as e:
             print(f"Error sending message: {e}", file=sys.stderr)
             return False
     
+    def send_long_message(self, chat_id: str, text: str, parse_mode: Optional[str] = 'HTML') -> bool:
+        """Send text split on line boundaries into messages under Telegram's size limit."""
+        return all(
+            self.send_message(chat_id, chunk, parse_mode)
+            for chunk in split_message(text.split('\n'))
+        )
+    
     def get_status_message(self) -> str:
-        """Get current status of all sites."""
-        # Get latest check for each page
-        statuses = []
+        """Get current status of all sites, reusing a reply up to STATUS_CACHE_TTL_SEC old."""
+        cached = self._status_cache
+        if cached and time.monotonic() - cached[0] < STATUS_CACHE_TTL_SEC:
+            return cached[1]
         
-        for page in self.config.pages:
-            last_check = self.db.get_last_check(page.target_id)
+        message = self._build_status_message()
+        # Stamp after the query so the cached snapshot does not start out aged
+        self._status_cache = (time.monotonic(), message)
+        return message
+    
+    def _build_status_message(self) -> str:
+        """Build the current status message from the latest checks."""
+        # Get latest check for every page in one query
+        last_checks = self.db.get_latest_checks_by_target()
+        pages = self.config.pages
+        lines = ["📊 <b>Статус мониторинга</b>", ""]
+        append = lines.append
+        counts = [0, 0, 0]
+        
+        for page in pages:
+            last_check = last_checks.get(page.target_id)
             
             if last_check:
-                # Determine emoji based on state
-                if last_check.state == 'OK':
-                    emoji = '🟢'
-                elif last_check.state == 'SLOW':
-                    emoji = '🟠'
-                else:
-                    emoji = '🔴'
-                
-                # Build status line: emoji + URL + HTTP + TTFB + Total + Error
-                status_line = f"{emoji} {last_check.url}"
-                
-                if last_check.http_code:
-                    status_line += f" HTTP: {last_check.http_code}"
-                
-                if last_check.ttfb is not None:
-                    status_line += f" TTFB: {last_check.ttfb:.3f}s"
-                
-                if last_check.total is not None:
-                    status_line += f" Total: {last_check.total:.3f}s"
-                
-                if last_check.error:
-                    status_line += f" Error: {last_check.error}"
-                
-                statuses.append(status_line)
+                counts[_STATE_INDEX.get(last_check.state, 2)] += 1
+                append(_format_status_line(last_check))
             else:
                 # No check yet
-                statuses.append(f"⚪ {page.url} Не проверялся")
-        
-        # Build message
-        message = "📊 <b>Статус мониторинга</b>\n\n"
-        message += "\n".join(statuses)
+                append(f"⚪ {page.url} Не проверялся")
         
         # Add summary
-        if statuses:
-            ok_count = sum(1 for s in statuses if '🟢' in s)
-            slow_count = sum(1 for s in statuses if '🟠' in s)
-            down_count = sum(1 for s in statuses if '🔴' in s)
-            
-            message += f"\n\n<b>Итого:</b> 🟢 {ok_count} | 🟠 {slow_count} | 🔴 {down_count}"
+        if pages:
+            lines.append("")
+            lines.append(_format_summary(counts))
         
-        return message
+        return "\n".join(lines)
     
     def check_single_site(self, url_or_domain: str) -> Optional[str]:
         """
@@ -121,16 +286,11 @@ class TelegramBot:
         if not url_or_domain.startswith('http'):
             url_or_domain = f"https://{url_or_domain}"
         
-        # Find matching page
+        # Find matching page: exact URL first, then by host
         matching_page = None
-        for page in self.config.pages:
-            if page.url == url_or_domain or page.url.rstrip('/') == url_or_domain.rstrip('/'):
-                matching_page = page
-                break
-            # Also check domain
-            domain = url_or_domain.replace('https://', '').replace('http://', '').split('/')[0]
-            if domain in page.url:
-                matching_page = page
+        for key in _lookup_keys(url_or_domain):
+            matching_page = self._page_index.get(key)
+            if matching_page:
                 break
         
         if not matching_page:
@@ -138,9 +298,7 @@ class TelegramBot:
         
         # Perform check
         try:
-            alert_profile = self.config.get_alert_profile(matching_page.alert_profile)
-            checker = PageChecker(matching_page, self.config.defaults, alert_profile)
-            ok, state, metrics = checker.check()
+            ok, state, metrics = self._checker(matching_page).check()
             
             now = time.time()
             result = CheckResult(
@@ -163,9 +321,10 @@ class TelegramBot:
             
             # Save to database
             self.db.save_check(result)
+            self._status_cache = None
             
             # Process alerts (will send notification if state changed)
-            alert_manager = AlertManager(self.db, self.config)
+            alert_manager = self._alert_manager
             metrics_dict = {
                 'url': matching_page.url,
                 'http_code': metrics.http_code,
@@ -176,127 +335,175 @@ class TelegramBot:
             alert_manager.process_check_result(
                 matching_page.target_id,
                 state,
-                alert_profile,
+                matching_page.profile,
                 metrics_dict,
             )
+            alert_manager.flush_alerts()
             
             # Build status message
-            if state == 'OK':
-                emoji = '🟢'
-            elif state == 'SLOW':
-                emoji = '🟠'
-            else:
-                emoji = '🔴'
-            
-            status_line = f"{emoji} {result.url}"
-            
-            if result.http_code:
-                status_line += f" HTTP: {result.http_code}"
-            
-            if result.ttfb is not None:
-                status_line += f" TTFB: {result.ttfb:.3f}s"
-            
-            if result.total is not None:
-                status_line += f" Total: {result.total:.3f}s"
-            
-            if result.error:
-                status_line += f" Error: {result.error}"
-            
-            return status_line
+            return _format_status_line(result)
             
         except Exception as e:
+            self._alert_manager.reset()
             return f"❌ Ошибка проверки: {e}"
     
+    def _check_one(self, page: PageConfig) -> Tuple[Optional[CheckResult], Optional[Exception]]:
+        """Check one page in a worker thread; DB writes and alerts stay on the caller."""
+        try:
+            ok, state, metrics = self._checker(page).check()
+        except Exception as e:
+            return None, e
+        
+        result = CheckResult(
+            timestamp=time.time(),
+            target_id=page.target_id,
+            site_name=page.site_name,
+            page_name=page.name,
+            url=page.url,
+            ok=ok,
+            state=state,
+            http_code=metrics.http_code,
+            dns=metrics.dns,
+            connect=metrics.connect,
+            tls=metrics.tls,
+            ttfb=metrics.ttfb,
+            total=metrics.total,
+            size=metrics.size,
+            error=metrics.error,
+        )
+        return result, None
+    
     def check_all_sites(self) -> str:
         """
         Check all sites and return status message.
         """
         statuses = []
-        alert_manager = AlertManager(self.db, self.config)
+        counts = [0, 0, 0]
+        results: List[CheckResult] = []
+        alert_manager = self._alert_manager
+        
+        # Network checks run in parallel; results are handled here in config order
+        pages = self.config.pages
+        workers = max(1, min(self.config.defaults.max_workers, len(pages)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(self._check_one, pages))
         
-        for i, page in enumerate(self.config.pages, 1):
+        # Load alert states for all pages in one query
+        alert_manager.load_states([page.target_id for page in pages])
+        
+        for page, (result, error) in zip(pages, outcomes):
+            if error is not None:
+                statuses.append(f"❌ {page.url} Ошибка: {error}")
+                continue
+            
+            # Saved below together with the rest of the run
+            results.append(result)
+            
             try:
-                alert_profile = self.config.get_alert_profile(page.alert_profile)
-                checker = PageChecker(page, self.config.defaults, alert_profile)
-                ok, state, metrics = checker.check()
-                
-                now = time.time()
-                result = CheckResult(
-                    timestamp=now,
-                    target_id=page.target_id,
-                    site_name=page.site_name,
-                    page_name=page.name,
-                    url=page.url,
-                    ok=ok,
-                    state=state,
-                    http_code=metrics.http_code,
-                    dns=metrics.dns,
-                    connect=metrics.connect,
-                    tls=metrics.tls,
-                    ttfb=metrics.ttfb,
-                    total=metrics.total,
-                    size=metrics.size,
-                    error=metrics.error,
-                )
-                
-                # Save to database
-                self.db.save_check(result)
-                
                 # Process alerts
                 metrics_dict = {
                     'url': page.url,
-                    'http_code': metrics.http_code,
-                    'ttfb': metrics.ttfb,
-                    'total': metrics.total,
-                    'error': metrics.error,
+                    'http_code': result.http_code,
+                    'ttfb': result.ttfb,
+                    'total': result.total,
+                    'error': result.error,
                 }
                 alert_manager.process_check_result(
                     page.target_id,
-                    state,
-                    alert_profile,
+                    result.state,
+                    page.profile,
                     metrics_dict,
                 )
                 
                 # Build status line
-                if state == 'OK':
-                    emoji = '🟢'
-                elif state == 'SLOW':
-                    emoji = '🟠'
-                else:
-                    emoji = '🔴'
-                
-                status_line = f"{emoji} {result.url}"
-                
-                if result.http_code:
-                    status_line += f" HTTP: {result.http_code}"
-                
-                if result.ttfb is not None:
-                    status_line += f" TTFB: {result.ttfb:.3f}s"
-                
-                if result.total is not None:
-                    status_line += f" Total: {result.total:.3f}s"
-                
-                if result.error:
-                    status_line += f" Error: {result.error}"
-                
-                statuses.append(status_line)
+                statuses.append(_format_status_line(result))
+                counts[_STATE_INDEX.get(result.state, 2)] += 1
                 
             except Exception as e:
                 statuses.append(f"❌ {page.url} Ошибка: {e}")
         
-        # Build message
-        message = "📊 <b>Проверка всех сайтов</b>\n\n"
-        message += "\n".join(statuses)
+        # Write all results and alert states in one transaction
+        try:
+            with self.db.batch():
+                self.db.save_checks(results)
+                alert_manager.flush_states()
+        except Exception:
+            # The queued alerts and cached states describe checks that were
+            # never saved, whether BEGIN failed or the batch was rolled back
+            alert_manager.reset()
+            raise
+        self._status_cache = None
         
-        # Add summary
+        # Send alerts queued during the loop
+        alert_manager.flush_alerts()
+        
+        # Build message with summary
+        lines = ["📊 <b>Проверка всех сайтов</b>", "", *statuses]
         if statuses:
-            ok_count = sum(1 for s in statuses if '🟢' in s)
-            slow_count = sum(1 for s in statuses if '🟠' in s)
-            down_count = sum(1 for s in statuses if '🔴' in s)
-            
-            message += f"\n\n<b>Итого:</b> 🟢 {ok_count} | 🟠 {slow_count} | 🔴 {down_count}"
+            lines += ["", _format_summary(counts)]
         
-        return message
+        return "\n".join(lines)
+    
+    def _reply_check_all(self, chat_id: str, announced: bool):
+        """Check all sites now and send the result, with the duration if a notice was sent."""
+        started = time.monotonic()
+        status_msg = self.check_all_sites()
+        if announced:
+            elapsed = time.monotonic() - started
+            status_msg = f"✅ Проверка завершена за {elapsed:.1f}s\n\n{status_msg}"
+        self.send_long_message(chat_id, status_msg)
+    
+    def _reply_check_single(self, chat_id: str, url_or_domain: str):
+        """Check one site now and send the result."""
+        result = self.check_single_site(url_or_domain)
+        
+        if result:
+            self.send_message(chat_id, f"📊 <b>Результат проверки</b>\n\n{result}")
+        else:
+            # Plain text: the echoed input may contain '<' or '&'
+            self.send_message(
+                chat_id,
+                f"❌ Сайт не найден: {url_or_domain}\n\nИспользуйте URL или домен из списка мониторинга.",
+                parse_mode=None,
+            )
+    
+    def _run_in_background(self, handler, *args):
+        """
+        Run a slow command on the command thread.
+        
+        Polling keeps going while sites are checked, so /check and /help
+        are answered immediately. Slow commands run one at a time, in the
+        order they arrived.
+        """
+        def run():
+            try:
+                handler(*args)
+            except Exception as e:
+                print(f"Error handling command: {e}", file=sys.stderr)
+        
+        self._command_executor.submit(run)
+    
+    def _handle_check(self, chat_id: str, args: str):
+        """Handle /check, /check all and /check <url>."""
+        if not args:
+            # /check - show current status
+            status_msg = self.get_status_message()
+            self.send_long_message(chat_id, status_msg)
+        
+        elif args.lower() == 'all':
+            # /check all - check all sites now; small configs get one reply
+            announced = len(self.config.pages) > QUIET_CHECK_ALL_MAX_PAGES
+            if announced:
+                self.send_message(chat_id, "⏳ Проверяю все сайты...", parse_mode=None)
+            self._run_in_background(self._reply_check_all, chat_id, announced)
+        
+        else:
+            # /check <url> - check specific site
+            self._run_in_background(self._reply_check_single, chat_id, args)
+    
+    def _handle_help(self, chat_id: str, args: str):
+        """Handle /start and /help."""
+        self.send_message(chat_id, _HELP_MSG)
     
     def process_updates(self):
         """Process incoming updates."""
@@ -310,43 +517,15 @@ class TelegramBot:
                 chat_id = str(message['chat']['id'])
                 text = message.get('text', '')
                 
-                if text.startswith('/check'):
-                    # Remove /check and strip whitespace
-                    command_text = text[6:].strip()  # Remove '/check' prefix
-                    
-                    if not command_text:
-                        # /check - show current status
-                        status_msg = self.get_status_message()
-                        self.send_message(chat_id, status_msg)
-                    
-                    elif command_text.lower() == 'all':
-                        # /check all - check all sites now
-                        self.send_message(chat_id, "⏳ Проверяю все сайты...")
-                        status_msg = self.check_all_sites()
-                        self.send_message(chat_id, status_msg)
-                    
-                    else:
-                        # /check <url> - check specific site
-                        url_or_domain = command_text
-                        result = self.check_single_site(url_or_domain)
-                        
-                        if result:
-                            self.send_message(chat_id, f"📊 <b>Результат проверки</b>\n\n{result}")
-                        else:
-                            self.send_message(chat_id, f"❌ Сайт не найден: {url_or_domain}\n\nИспользуйте URL или домен из списка мониторинга.")
-                
-                elif text.startswith('/start') or text.startswith('/help'):
-                    help_msg = (
-                        "🤖 <b>Website Monitoring Bot</b>\n\n"
-                        "Доступные команды:\n"
-                        "/check - показать текущий статус всех сайтов\n"
-                        "/check all - проверить все сайты прямо сейчас\n"
-                        "/check <url> - проверить конкретный сайт\n"
-                        "  Пример: /check nestcentre.org\n"
-                        "  Пример: /check https://nestcentre.org/\n"
-                        "/help - показать эту справку"
-                    )
-                    self.send_message(chat_id, help_msg)
+                # "/check@BotName all" -> command "/check", args "all"
+                command, _, args = text.strip().partition(' ')
+                handler = self._handlers.get(command.partition('@')[0].lower())
+                if handler:
+                    handler(chat_id, args.strip())
+        
+        # Persist the offset so a restart does not replay handled commands
+        if updates:
+            self.db.set_kv(LAST_UPDATE_ID_KEY, self.last_update_id)
     
     def run(self):
         """Run bot in polling mode."""
@@ -354,10 +533,11 @@ class TelegramBot:
         
         while True:
             try:
+                # getUpdates long-polls server-side, so no extra delay is needed
                 self.process_updates()
-                time.sleep(1)  # Small delay to avoid rate limiting
             except KeyboardInterrupt:
                 print("\nBot stopped.")
+                self.close()
                 break
             except Exception as e:
                 print(f"Error in bot loop: {e}", file=sys.stderr)
@@ -388,7 +568,7 @@ def main():
     if not os.path.isabs(db_path):
         db_path = os.path.join('/app/data', db_path)
     
-    db = Database(db_path)
+    db = Database(db_path, read_pool_size=READ_POOL_SIZE)
     
     # Create and run bot
     bot = TelegramBot(bot_token, db, config)